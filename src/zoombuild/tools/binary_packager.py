@@ -6,6 +6,7 @@ import os
 import pathlib
 import subprocess
 import sys
+import tempfile
 import zipfile
 import zlib
 import platform
@@ -13,8 +14,8 @@ import platform
 import click
 import tqdm
 
-from . import metadata
-from .project_info import PyProject
+from . import metadata, native_libs, stream_archive
+from .project_info import PyProject, load_project
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -62,32 +63,135 @@ def _precompile_bytecode(venv_site_packages):
         sys.exit(99)
 
 
-def _precompute_file_count(directory):
-    total_items = 0
-    for _, dirs, files in os.walk(directory):
-        total_items += len(files)
-    return total_items
-
-
-def archive_venv(project: PyProject, output=None, deploy_folder="deploy"):
+def _collect_files(venv_site_packages):
+    """
+    Returns the (full_path, archive_path) pairs to be archived in a single
+    pass over the tree, which also gives us the count for the progress bar.
+    """
+    collected = []
+    for root, _, files in os.walk(venv_site_packages):
+        root_path = pathlib.Path(root)
+        if root_path == venv_site_packages:
+            continue
+        if root_path == venv_site_packages / "__pycache__":
+            continue
+        for f in files:
+            full_path = root_path / f
+            collected.append((full_path, full_path.relative_to(venv_site_packages)))
+    return collected
+
+
+def validate_stream(checksum, stream):
+    # a partial archive left by an interrupted build just needs rebuilding
+    try:
+        header = stream_archive.read_header(stream)
+    except (stream_archive.StreamError, ValueError) as e:
+        logger.warning(f"{stream} is not a usable stream archive: {e}")
+        return False
+    return header.get("checksum") == checksum
+
+
+def _write_zip(target, files, requirements, ini_text, progress):
+    with zipfile.ZipFile(target, "w") as archive:
+        for full_path, archive_path in files:
+            archive.write(full_path, archive_path)
+            progress.update(1)
+            logger.debug(full_path.name)
+
+        logger.debug("adding unzipper")
+        main_script = generate_unzip_text()
+        archive.writestr("__main__.py", main_script)
+        progress.update(1)
+
+        logger.debug("adding requirements")
+        archive.writestr("requirements.txt", requirements)
+        progress.update(1)
+
+        archive.writestr(metadata.METADATA_FILE, ini_text)
+        progress.update(1)
+
+
+def _write_stream(
+    target, files, requirements, ini_text, progress, deploy_folder, checksum, native=None
+):
+    # the metadata goes in the stream header rather than as an entry, so that
+    # the unpacker can decide whether to deploy before any files arrive
+    entries = [(archive_path.as_posix(), full_path) for full_path, archive_path in files]
+    entries.append(("requirements.txt", requirements))
+    duplicates = {}
+    if native:
+        duplicates = {d.as_posix(): c.as_posix() for d, c in native.duplicates.items()}
+
+    def advance(archive_path):
+        progress.update(1)
+        logger.debug(archive_path)
+
+    with open(target, "wb") as handle:
+        stream_archive.write_stream(
+            handle,
+            entries,
+            folder=deploy_folder,
+            checksum=checksum,
+            metadata_file=metadata.METADATA_FILE,
+            metadata_text=ini_text,
+            duplicates=duplicates,
+            progress=advance,
+        )
+    # the header and end record
+    progress.update(2)
+
+
+ARCHIVE_FORMATS = {
+    # format: (file extension, validator)
+    "zip": (".zip", validate_zip),
+    "stream": (".zbs", validate_stream),
+}
+
+
+def _native_checksum(checksum, strip_native, debug_symbols, dedup_native):
+    """
+    Folds the native stage options into the checksum, so that changing
+    them rebuilds the archive and redeploys it
+    """
+    if not (strip_native or debug_symbols or dedup_native):
+        return checksum
+    options = f"strip={strip_native};debug={debug_symbols};dedup={dedup_native}".encode()
+    return str(zlib.crc32(options, int(checksum)))
+
+
+def archive_venv(
+    project: PyProject,
+    output=None,
+    deploy_folder="deploy",
+    archive_format="zip",
+    strip_native=False,
+    debug_symbols=False,
+    dedup_native=False,
+):
     logger.info("Packing .venv")
+    strip_native = strip_native or debug_symbols
 
     venv = pathlib.Path(project.find_virtualenv())
-    venv_site_packages = venv / "Lib" / "site-packages"
+    extension, validate = ARCHIVE_FORMATS[archive_format]
 
     if not output:
         platform_string = platform.system().lower()
-        output = pathlib.Path(project.project_root) / f"{project.name}.bin.{platform_string}.zip"
+        output = (
+            pathlib.Path(project.project_root)
+            / f"{project.name}.bin.{platform_string}{extension}"
+        )
 
     target_zip = pathlib.Path(output).expanduser().resolve()
     requirements, checksum = collect_requirements(project)
+    checksum = _native_checksum(checksum, strip_native, debug_symbols, dedup_native)
     
     logger.info(f"syncing virtual environment {venv}...")
     project.sync()
+    venv_site_packages = pathlib.Path(project.find_site_packages())
 
     if target_zip.exists():
         logger.info("comparing dependencies")
-        if validate_zip(checksum, target_zip):
+        if validate(checksum, target_zip):
             # this means we don't need to re-vendor
             logger.info("no new vendored dependencies, complete")
             sys.exit(0)
@@ -98,43 +202,44 @@ def archive_venv(project: PyProject, output=None, deploy_folder="deploy"):
     _precompile_bytecode(venv_site_packages)
 
     try:
-        with zipfile.ZipFile(target_zip, "w") as archive:
-            file_total = _precompute_file_count(venv_site_packages)
-            with tqdm.tqdm(total=file_total, desc="copying", unit=" files") as progress:
-                for root, _, files in os.walk(venv_site_packages):
-                    root_path = pathlib.Path(root)
-                    if root_path == venv_site_packages:
-                        continue
-                    if root_path == venv_site_packages / "__pycache__":
-                        continue
-                    for f in files:
-                        full_path = root_path / f
-                        archive_path = full_path.relative_to(venv_site_packages)
-                        archive.write(full_path, archive_path)
-                        progress.update(1)
-                        logger.debug(f)
-
-                logger.debug("adding unzipper")
-                main_script = generate_unzip_text()
-                archive.writestr("__main__.py", main_script)
-                progress.update(1)
-
-                logger.debug("adding requirements")
-                archive.writestr("requirements.txt", requirements)
-                progress.update(1)
-
-                INI_text = metadata.create_binary_metadata(
-                    project, output, deploy_folder, checksum
+        files = _collect_files(venv_site_packages)
+        with tempfile.TemporaryDirectory() as work_dir:
+            native = None
+            if strip_native or dedup_native:
+                debug_archive = None
+                if debug_symbols:
+                    debug_archive = target_zip.with_name(f"{target_zip.stem}.debug.zip")
+                files, native = native_libs.process_native_libraries(
+                    files,
+                    work_dir,
+                    strip=strip_native,
+                    dedup=dedup_native,
+                    debug_archive=debug_archive,
                 )
-                archive.writestr(metadata.METADATA_FILE, INI_text)
-                progress.update(1)
-                progress.update(1)
-            progress.close()
+
+            INI_text = metadata.create_binary_metadata(
+                project, output, deploy_folder, checksum, native=native
+            )
+            with tqdm.tqdm(total=len(files) + 3, desc="copying", unit=" files") as progress:
+                if archive_format == "stream":
+                    _write_stream(
+                        target_zip,
+                        files,
+                        requirements,
+                        INI_text,
+                        progress,
+                        deploy_folder,
+                        checksum,
+                        native,
+                    )
+                else:
+                    _write_zip(target_zip, files, requirements, INI_text, progress)
+                progress.close()
 
     except Exception as e:
         logger.exception(e)
         logger.warning(f"build failed, removing {target_zip}")
-        target_zip.unlink()
+        target_zip.unlink(missing_ok=True)
 
     logger.info(f"built {target_zip}")
     sys.exit(0)
@@ -144,8 +249,38 @@ def archive_venv(project: PyProject, output=None, deploy_folder="deploy"):
 @click.argument("project")
 @click.option("--output", default=None, help="Output path for the zip file")
 @click.option("--deploy-folder", default="deploy", help="Target folder name for deployment")
+@click.option(
+    "--format",
+    "archive_format",
+    type=click.Choice(list(ARCHIVE_FORMATS)),
+    default="zip",
+    help="'zip' for a self-extracting zip, 'stream' for an archive that can be "
+    "extracted while it is still being copied",
+)
+@click.option(
+    "--strip-native", is_flag=True, help="Strip debug sections from ELF native libraries"
+)
+@click.option(
+    "--debug-symbols",
+    is_flag=True,
+    help="Strip native libraries, saving their debug sections in a separate .debug.zip",
+)
+@click.option(
+    "--dedup-native",
+    is_flag=True,
+    help="Store byte-identical native libraries once; they are restored on extraction",
+)
 @click.option("--verbose", is_flag=True, help="Increase logging verbosity")
-def main(project, output, deploy_folder, verbose):
+def main(
+    project,
+    output,
+    deploy_folder,
+    archive_format,
+    strip_native,
+    debug_symbols,
+    dedup_native,
+    verbose,
+):
     """
     Package a virtual environment into a self-extracting zip file.
 
@@ -158,7 +293,15 @@ def main(project, output, deploy_folder, verbose):
     if not project_path.exists():
         raise ValueError(f"Project {project} not found")
 
-    prj = PyProject(project_path)
-
-    archive_venv(prj, output=output, deploy_folder=deploy_folder)
+    prj = load_project(project_path)
+
+    archive_venv(
+        prj,
+        output=output,
+        deploy_folder=deploy_folder,
+        archive_format=archive_format,
+        strip_native=strip_native,
+        debug_symbols=debug_symbols,
+        dedup_native=dedup_native,
+    )
 
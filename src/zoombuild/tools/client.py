@@ -0,0 +1,203 @@
+"""
+Thin entry points for the zb command line tools.
+
+These deliberately stick to the standard library so that they start quickly:
+if a zb daemon is listening (see daemon.py) the command line is forwarded to it
+and its output is replayed here. Otherwise the real tool is imported and run
+in-process, exactly as if it had been called directly.
+"""
+
+import importlib
+import json
+import os
+import socket
+import struct
+import sys
+import tempfile
+
+from . import __version__
+
+SOCKET_ENV = "ZB_DAEMON_SOCKET"
+NO_DAEMON_ENV = "ZB_NO_DAEMON"
+
+# tool name -> module whose click command implements it
+TOOLS = {
+    "package": "zoombuild.tools.binary_packager",
+    "python": "zoombuild.tools.python_packager",
+    "test": "zoombuild.tools.test_runner",
+}
+
+
+# environment variables forwarded to the daemon: the ones the tools (and the
+# uv, objcopy and python processes they start) actually read.  Everything
+# else stays with the client.
+FORWARDED_ENV = {
+    "PATH",
+    "HOME",
+    "USERNAME",
+    "COMPUTERNAME",
+    "OBJCOPY",
+    "HTTP_PROXY",
+    "HTTPS_PROXY",
+    "NO_PROXY",
+    "ALL_PROXY",
+    "SSL_CERT_FILE",
+    "SSL_CERT_DIR",
+}
+FORWARDED_ENV_PREFIXES = ("UV_",)
+
+
+def is_forwarded(name):
+    name = name.upper()
+    return name in FORWARDED_ENV or name.startswith(FORWARDED_ENV_PREFIXES)
+
+
+def forwarded_environment():
+    return {k: v for k, v in os.environ.items() if is_forwarded(k)}
+
+
+def socket_dir():
+    """
+    Returns the private directory holding the daemon socket: $XDG_RUNTIME_DIR
+    if it is set, otherwise a per-user folder in the temp directory which the
+    daemon creates with 0700 permissions
+    """
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return runtime_dir
+    return os.path.join(tempfile.gettempdir(), f"zoombuild-{os.getuid()}")
+
+
+def socket_path():
+    """
+    Returns the path of the daemon socket; override with ZB_DAEMON_SOCKET
+    """
+    override = os.environ.get(SOCKET_ENV)
+    if override:
+        return override
+    return os.path.join(socket_dir(), "zoombuild.sock")
+
+
+def daemon_supported():
+    return hasattr(socket, "AF_UNIX") and hasattr(os, "getuid")
+
+
+def owned_by_user(path):
+    """
+    True if path belongs to the current user and nobody else can write to it
+    """
+    info = os.stat(path)
+    return info.st_uid == os.getuid() and not info.st_mode & 0o022
+
+
+def peer_uid(conn):
+    """
+    Returns the uid of the process at the other end of a unix socket, or None
+    if the platform can't tell us
+    """
+    if not hasattr(socket, "SO_PEERCRED"):
+        return None
+    creds = conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    _pid, uid, _gid = struct.unpack("3i", creds)
+    return uid
+
+
+def send_message(handle, message):
+    handle.write(json.dumps(message) + "\n")
+    handle.flush()
+
+
+def connect(path=None):
+    """
+    Returns a connected socket for the daemon, or None if it is not running.
+    Sockets owned by another user are ignored, so nothing is ever sent to a
+    daemon someone else started.
+    """
+    if not daemon_supported():
+        return None
+    path = path or socket_path()
+    if not os.path.exists(path):
+        return None
+    if not (owned_by_user(path) and owned_by_user(os.path.dirname(os.path.abspath(path)))):
+        sys.stderr.write(f"ignoring zb daemon socket {path}: not private to this user\n")
+        return None
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(path)
+    except OSError:
+        conn.close()
+        return None
+    if peer_uid(conn) not in (None, os.getuid()):
+        conn.close()
+        sys.stderr.write(f"ignoring zb daemon socket {path}: owned by another user\n")
+        return None
+    return conn
+
+
+def request(message, path=None, stdout=None, stderr=None):
+    """
+    Sends a single request to the daemon, replaying any output it streams
+    back. Returns the daemon's final reply, or None if no daemon is running.
+    """
+    conn = connect(path)
+    if conn is None:
+        return None
+
+    stdout = stdout or sys.stdout
+    stderr = stderr or sys.stderr
+    with conn, conn.makefile("rw", encoding="utf-8", newline="\n") as handle:
+        send_message(handle, message)
+        for line in handle:
+            reply = json.loads(line)
+            if "exit" in reply:
+                return reply
+            stream = stdout if reply.get("stream") == "stdout" else stderr
+            stream.write(reply["data"])
+            stream.flush()
+
+    stderr.write("zb daemon closed the connection before the command finished\n")
+    return {"exit": 1}
+
+
+def forward(tool, args, path=None):
+    """
+    Runs a tool in the daemon. Returns the exit code, or None if the command
+    should be run in-process instead.
+    """
+    if os.environ.get(NO_DAEMON_ENV):
+        return None
+    message = {
+        "command": "run",
+        "tool": tool,
+        "args": list(args),
+        "cwd": os.getcwd(),
+        "env": forwarded_environment(),
+        # the daemon only runs commands for the same install it was started
+        # from; another project's venv gets a cold, in-process run instead
+        "executable": sys.executable,
+        "version": __version__,
+    }
+    reply = request(message, path)
+    if reply is None or reply.get("refused"):
+        return None
+    return reply["exit"]
+
+
+def _run(tool):
+    code = forward(tool, sys.argv[1:])
+    if code is None:
+        module = importlib.import_module(TOOLS[tool])
+        return module.main(prog_name=f"zb-{tool}")
+    sys.exit(code)
+
+
+def package():
+    _run("package")
+
+
+def python():
+    _run("python")
+
+
+def test():
+    _run("test")
@@ -0,0 +1,334 @@
+import codecs
+import contextlib
+import importlib
+import io
+import json
+import logging
+import os
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+import traceback
+
+import click
+
+from . import __version__, client
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+handler = logging.StreamHandler()
+formatter = logging.Formatter("{message}", style="{")
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+# the tools change the working directory, swap out stdout/stderr and
+# adjust logger levels, all of which are process-wide, so only one
+# command runs at a time.  Pings and stop requests don't need the lock.
+_run_lock = threading.Lock()
+
+
+class _ReplyStream(io.TextIOBase):
+    """
+    File-like object that forwards everything written to it to the
+    client as a 'stream' message.  Streams for the same client share a
+    lock, since child process output is pumped in from other threads.
+    """
+
+    def __init__(self, handle, name, lock):
+        self.handle = handle
+        self.name = name
+        self.lock = lock
+
+    def writable(self):
+        return True
+
+    def isatty(self):
+        return False
+
+    def write(self, text):
+        # click probes for binary streams by writing b"" -- refuse it
+        if not isinstance(text, str):
+            raise TypeError(f"write() argument must be str, not {type(text).__name__}")
+        if text:
+            with self.lock:
+                client.send_message(self.handle, {"stream": self.name, "data": text})
+        return len(text)
+
+
+def _pump(read_fd, stream):
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    with os.fdopen(read_fd, "rb", buffering=0) as pipe:
+        while chunk := pipe.read(65536):
+            stream.write(decoder.decode(chunk))
+    stream.write(decoder.decode(b"", final=True))
+
+
+@contextlib.contextmanager
+def _redirect_fds(out, err):
+    """
+    Points file descriptors 1 and 2 at pipes feeding out and err while the
+    block runs.  redirect_stdout only replaces sys.stdout: child processes
+    (uv, objcopy) inherit the descriptors, which would otherwise still be
+    the daemon's own.
+    """
+    saved = []
+    pumps = []
+    try:
+        for fd, stream in ((1, out), (2, err)):
+            read_fd, write_fd = os.pipe()
+            saved.append((fd, os.dup(fd)))
+            os.dup2(write_fd, fd)
+            os.close(write_fd)
+            pump = threading.Thread(target=_pump, args=(read_fd, stream), daemon=True)
+            pump.start()
+            pumps.append(pump)
+        yield
+    finally:
+        sys.__stdout__.flush()
+        sys.__stderr__.flush()
+        # restoring the descriptors closes the pipes, which ends the pumps
+        for fd, copy in saved:
+            os.dup2(copy, fd)
+            os.close(copy)
+        for pump in pumps:
+            pump.join()
+
+
+def _exit_code(exc: SystemExit, err):
+    if exc.code is None:
+        return 0
+    if isinstance(exc.code, int):
+        return exc.code
+    err.write(f"{exc.code}\n")
+    return 1
+
+
+def _client_environment(env):
+    """
+    The daemon's environment, with the variables the client is allowed to
+    forward (see client.FORWARDED_ENV) replaced by the client's values
+    """
+    merged = {k: v for k, v in os.environ.items() if not client.is_forwarded(k)}
+    merged.update({k: v for k, v in env.items() if client.is_forwarded(k)})
+    return merged
+
+
+def run_tool(tool, args, cwd, env, out, err):
+    """
+    Runs one of the zb click commands in this process, as if it had been
+    started from cwd with the client's environment variables env, with its
+    output (and that of any child processes) redirected to out and err.
+    Returns the exit code.
+    """
+    module = importlib.import_module(client.TOOLS[tool])
+    # every zoombuild module has its own logger and handler (native_libs,
+    # project_info...), not just the tool's, and they are bound to the
+    # daemon's stderr
+    tool_handlers = [
+        h
+        for name, log in logging.Logger.manager.loggerDict.items()
+        if name.startswith("zoombuild.") and name != __name__ and isinstance(log, logging.Logger)
+        for h in log.handlers
+        if isinstance(h, logging.StreamHandler)
+    ]
+
+    with _run_lock:
+        previous_cwd = os.getcwd()
+        previous_env = os.environ.copy()
+        previous_level = module.logger.level
+        previous_streams = [h.setStream(err) for h in tool_handlers]
+        try:
+            os.chdir(cwd)
+            if env is not None:
+                client_env = _client_environment(env)
+                os.environ.clear()
+                os.environ.update(client_env)
+            with (
+                _redirect_fds(out, err),
+                contextlib.redirect_stdout(out),
+                contextlib.redirect_stderr(err),
+            ):
+                module.main.main(args=args, prog_name=f"zb-{tool}")
+            code = 0
+        except SystemExit as exc:
+            code = _exit_code(exc, err)
+        except Exception:  # noqa: BLE001 - report any tool failure to the client, keep serving
+            traceback.print_exc(file=err)
+            code = 1
+        finally:
+            os.chdir(previous_cwd)
+            os.environ.clear()
+            os.environ.update(previous_env)
+            module.logger.setLevel(previous_level)
+            for h, stream in zip(tool_handlers, previous_streams):
+                h.setStream(stream)
+
+    return code
+
+
+def _same_install(message):
+    """
+    True if the client runs the same interpreter and zoombuild version as
+    the daemon.  Each project venv has its own zoombuild, and the daemon's
+    interpreter and code would otherwise leak into that project's build
+    (compiled bytecode, the python version recorded in environment.ini)
+    """
+    return message.get("executable") == sys.executable and message.get("version") == __version__
+
+
+class _RequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        if client.peer_uid(self.request) not in (None, os.getuid()):
+            logger.warning("rejected connection from another user")
+            return
+        with self.request.makefile("rw", encoding="utf-8", newline="\n") as handle:
+            line = handle.readline()
+            if line:
+                self.dispatch(json.loads(line), handle)
+
+    def dispatch(self, message, handle):
+        command = message.get("command")
+
+        if command == "ping":
+            client.send_message(handle, {"exit": 0, "pid": os.getpid()})
+        elif command == "stop":
+            client.send_message(handle, {"exit": 0})
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+        elif command == "run" and not _same_install(message):
+            logger.debug(f"refusing {message.get('executable')} ({message.get('version')})")
+            client.send_message(handle, {"exit": None, "refused": "different zoombuild install"})
+        elif command == "run" and message.get("tool") in client.TOOLS:
+            logger.debug(f"{message['tool']} {' '.join(message['args'])}")
+            lock = threading.Lock()
+            out = _ReplyStream(handle, "stdout", lock)
+            err = _ReplyStream(handle, "stderr", lock)
+            code = run_tool(
+                message["tool"], message["args"], message["cwd"], message.get("env"), out, err
+            )
+            with lock:
+                client.send_message(handle, {"exit": code})
+        else:
+            client.send_message(handle, {"stream": "stderr", "data": f"bad request {message}\n"})
+            client.send_message(handle, {"exit": 2})
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def _warm_up():
+    # import the tools (and with them click, tqdm and tomli) up front so
+    # the first forwarded command doesn't pay for it
+    for module in client.TOOLS.values():
+        importlib.import_module(module)
+
+
+def _private_socket_dir(path):
+    """
+    Creates the folder for the socket if needed, and refuses to use one
+    that other users could tamper with
+    """
+    folder = os.path.dirname(os.path.abspath(path))
+    os.makedirs(folder, mode=0o700, exist_ok=True)
+    if not client.owned_by_user(folder):
+        raise RuntimeError(f"{folder} is not private to this user, not starting the zb daemon")
+
+
+def serve(path=None):
+    path = path or client.socket_path()
+    _private_socket_dir(path)
+    probe = client.connect(path)
+    if probe:
+        probe.close()
+        raise RuntimeError(f"zb daemon already running on {path}")
+    if os.path.exists(path):
+        os.unlink(path)
+
+    _warm_up()
+    previous_umask = os.umask(0o077)
+    try:
+        server = DaemonServer(path, _RequestHandler)
+    finally:
+        os.umask(previous_umask)
+
+    logger.info(f"zb daemon listening on {path}")
+    try:
+        with server:
+            server.serve_forever()
+    finally:
+        if os.path.exists(path):
+            os.unlink(path)
+        logger.info("zb daemon stopped")
+
+
+def _ping(path):
+    return client.request({"command": "ping"}, path)
+
+
+@click.group(help="Keep zb tools warm in a background process")
+@click.option("--socket", "socket_path", default=None, help="Path to the daemon socket")
+@click.option("--verbose", is_flag=True, help="Increase logging verbosity")
+@click.pass_context
+def main(ctx, socket_path, verbose):
+    if verbose:
+        logger.setLevel(logging.DEBUG)
+    if not client.daemon_supported():
+        raise click.ClickException("the zb daemon needs unix socket support")
+    ctx.obj = socket_path or client.socket_path()
+
+
+@main.command(help="Run the daemon in the foreground")
+@click.pass_obj
+def run(path):
+    serve(path)
+
+
+@main.command(help="Start the daemon in the background")
+@click.option("--timeout", default=10.0, help="Seconds to wait for the daemon to come up")
+@click.pass_obj
+def start(path, timeout):
+    reply = _ping(path)
+    if reply:
+        logger.info(f"zb daemon already running (pid {reply['pid']})")
+        return
+
+    subprocess.Popen(
+        [sys.executable, "-m", "zoombuild.tools.daemon", "--socket", path, "run"],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        reply = _ping(path)
+        if reply:
+            logger.info(f"zb daemon started (pid {reply['pid']})")
+            return
+        time.sleep(0.1)
+    raise click.ClickException(f"zb daemon did not start within {timeout} seconds")
+
+
+@main.command(help="Stop a running daemon")
+@click.pass_obj
+def stop(path):
+    if client.request({"command": "stop"}, path) is None:
+        logger.info("zb daemon is not running")
+    else:
+        logger.info("zb daemon stopped")
+
+
+@main.command(help="Report whether the daemon is running")
+@click.pass_obj
+def status(path):
+    reply = _ping(path)
+    if reply is None:
+        logger.info("zb daemon is not running")
+        sys.exit(1)
+    logger.info(f"zb daemon running on {path} (pid {reply['pid']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,9 @@ PROJECT_KEY = "project"
 ZIP_KEY = "archive"
 BUILD_KEY = "build"
 PYTHON_VERSION = "python_version"
+NATIVE_KEY = "native"
+DUPLICATES_KEY = "duplicates"
+DUPLICATE_SEPARATOR = " -> "
 
 
 def project_keys():
@@ -29,6 +32,9 @@ def project_keys():
         'BUILD_KEY':BUILD_KEY,
         'PYTHON_KEY':PYTHON_KEY,
         'PROJECT_KEY':PROJECT_KEY,
+        'NATIVE_KEY':NATIVE_KEY,
+        'DUPLICATES_KEY':DUPLICATES_KEY,
+        'DUPLICATE_SEPARATOR':DUPLICATE_SEPARATOR,
     }
 
 
@@ -54,20 +60,41 @@ def add_build_metadata(cfg):
         "python_version": sys.version,
     }
 
+def add_native_metadata(report, cfg):
+    """
+    Records what the native library stage did.  The duplicates are needed
+    by the unpackers, which recreate them from their canonical copies
+    """
+    duplicates = [
+        f"{duplicate.as_posix()}{DUPLICATE_SEPARATOR}{canonical.as_posix()}"
+        for duplicate, canonical in report.duplicates.items()
+    ]
+    cfg[NATIVE_KEY] = {
+        "stripped": len(report.stripped),
+        "stripped_bytes": report.stripped_bytes,
+        "deduplicated": len(report.duplicates),
+        "deduplicated_bytes": report.duplicate_bytes,
+        "debug_symbols": report.debug_archive or "",
+        DUPLICATES_KEY: "\n".join(duplicates),
+    }
+
 
-def create_binary_metadata(project, binary_zip, deploy_folder, checksum):
+def create_binary_metadata(project, binary_zip, deploy_folder, checksum, native=None):
     """
     Returns a string in INI format with metadata about this build.
 
     The key functional part of the metadata is the final section,
     which includes the checksum for the requirements.txt.  This
     will be consumed by the unzipper function in the zip files __main__
-    method
+    method.  If the native library stage ran, its NativeReport is
+    recorded too.
     """
     cfg = configparser.ConfigParser()
     add_project_metadata(project, cfg)
     add_python_metadata(project, cfg)
     add_build_metadata(cfg)
+    if native:
+        add_native_metadata(native, cfg)
 
     cfg[DEPLOY_KEY] = {
         FOLDER_KEY: deploy_folder,
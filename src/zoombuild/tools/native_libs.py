@@ -0,0 +1,197 @@
+import hashlib
+import logging
+import os
+import pathlib
+import shutil
+import subprocess
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+handler = logging.StreamHandler()
+formatter = logging.Formatter("{message}", style="{")
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+NATIVE_SUFFIXES = (".so", ".pyd", ".dll", ".dylib")
+ELF_MAGIC = b"\x7fELF"
+DEBUG_SUFFIX = ".debug"
+
+
+def is_native_library(path):
+    """
+    True for shared libraries, including versioned ones like libgomp.so.1
+    """
+    name = pathlib.Path(path).name.lower()
+    return name.endswith(NATIVE_SUFFIXES) or ".so." in name
+
+
+def is_elf(path):
+    with open(path, "rb") as handle:
+        return handle.read(len(ELF_MAGIC)) == ELF_MAGIC
+
+
+def find_objcopy():
+    return os.environ.get("OBJCOPY") or shutil.which("objcopy")
+
+
+def _digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        while chunk := handle.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def find_duplicates(files):
+    """
+    Returns {duplicate archive path: canonical archive path} for native
+    libraries in files which are byte-identical to one that comes earlier
+    """
+    candidates = [(full, arc) for full, arc in files if is_native_library(full)]
+    by_size = {}
+    for full_path, archive_path in candidates:
+        by_size.setdefault(os.path.getsize(full_path), []).append((full_path, archive_path))
+
+    duplicates = {}
+    for group in by_size.values():
+        if len(group) < 2:
+            continue
+        canonical = {}
+        for full_path, archive_path in group:
+            key = _digest(full_path)
+            if key in canonical:
+                duplicates[archive_path] = canonical[key]
+            else:
+                canonical[key] = archive_path
+    return duplicates
+
+
+def strip_library(objcopy, source, stripped, debug_file=None):
+    """
+    Writes a copy of the ELF file 'source' without debug sections to
+    'stripped'.  If debug_file is supplied the debug sections are saved
+    there and linked from the stripped copy.  Returns the bytes saved, or
+    0 (and writes nothing) if there was nothing to strip.  If objcopy fails
+    nothing is left behind either, so a debug file can never end up in the
+    debug archive without a stripped library linking to it.
+    """
+    os.makedirs(os.path.dirname(stripped), exist_ok=True)
+    strip_cmd = [objcopy, "--strip-debug"]
+    try:
+        if debug_file:
+            os.makedirs(os.path.dirname(debug_file), exist_ok=True)
+            subprocess.check_call([objcopy, "--only-keep-debug", str(source), str(debug_file)])
+            strip_cmd.append(f"--add-gnu-debuglink={debug_file}")
+        subprocess.check_call(strip_cmd + [str(source), str(stripped)])
+    except subprocess.CalledProcessError:
+        _remove_outputs(stripped, debug_file)
+        raise
+
+    saved = os.path.getsize(source) - os.path.getsize(stripped)
+    # the debuglink section makes a file with no debug info slightly bigger
+    if saved <= 0:
+        _remove_outputs(stripped, debug_file)
+        return 0
+    return saved
+
+
+def _remove_outputs(*paths):
+    for path in paths:
+        if path and os.path.exists(path):
+            os.unlink(path)
+
+
+class NativeReport:
+    """
+    What the native stage changed, for environment.ini and the unpackers
+    """
+
+    def __init__(self):
+        self.stripped = []
+        self.stripped_bytes = 0
+        self.duplicates = {}
+        self.duplicate_bytes = 0
+        self.debug_archive = None
+
+
+def process_native_libraries(files, work_dir, strip=False, dedup=False, debug_archive=None):
+    """
+    Runs the native stage over the (full_path, archive_path) pairs collected
+    from site-packages. The virtual environment itself is never modified:
+    stripped copies are written to work_dir and substituted in the returned
+    file list, and duplicates are dropped from it.
+
+    Returns (files, NativeReport)
+    """
+    report = NativeReport()
+    if dedup:
+        report.duplicates = find_duplicates(files)
+        kept = []
+        for full_path, archive_path in files:
+            if archive_path in report.duplicates:
+                report.duplicate_bytes += os.path.getsize(full_path)
+            else:
+                kept.append((full_path, archive_path))
+        files = kept
+        logger.info(
+            f"found {len(report.duplicates)} duplicate native libraries"
+            f" ({report.duplicate_bytes // 1024} KB)"
+        )
+
+    if not (strip or debug_archive):
+        return files, report
+
+    objcopy = find_objcopy()
+    if not objcopy:
+        logger.warning("objcopy not found, native libraries will not be stripped")
+        return files, report
+
+    work_dir = pathlib.Path(work_dir)
+    debug_dir = work_dir / "debug"
+    targets = [
+        (full_path, archive_path)
+        for full_path, archive_path in files
+        if is_native_library(full_path) and is_elf(full_path)
+    ]
+
+    def _strip(item):
+        full_path, archive_path = item
+        stripped = work_dir / "stripped" / archive_path
+        debug_file = None
+        if debug_archive:
+            debug_file = debug_dir / archive_path.with_name(archive_path.name + DEBUG_SUFFIX)
+        try:
+            return stripped, strip_library(objcopy, full_path, stripped, debug_file)
+        except subprocess.CalledProcessError as e:
+            # objcopy doesn't understand every ELF out there; ship those as-is
+            logger.warning(f"could not strip {archive_path} ({e}), keeping it unstripped")
+            return stripped, 0
+
+    # objcopy does the work, so threads are enough to keep every core busy
+    with ThreadPoolExecutor() as pool:
+        results = dict(zip((arc for _, arc in targets), pool.map(_strip, targets)))
+
+    processed = []
+    for full_path, archive_path in files:
+        stripped, saved = results.get(archive_path, (None, 0))
+        if saved:
+            report.stripped.append(archive_path)
+            report.stripped_bytes += saved
+            full_path = stripped
+        processed.append((full_path, archive_path))
+
+    logger.info(
+        f"stripped debug info from {len(report.stripped)} native libraries"
+        f" ({report.stripped_bytes // 1024} KB)"
+    )
+
+    if debug_archive and report.stripped:
+        with zipfile.ZipFile(debug_archive, "w", zipfile.ZIP_DEFLATED) as archive:
+            for debug_file in debug_dir.rglob(f"*{DEBUG_SUFFIX}"):
+                archive.write(debug_file, debug_file.relative_to(debug_dir))
+        report.debug_archive = pathlib.Path(debug_archive).name
+        logger.info(f"wrote debug symbols to {debug_archive}")
+
+    return processed, report
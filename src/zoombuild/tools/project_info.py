@@ -1,23 +1,38 @@
+import glob
+import hashlib
+import re
 import tomli
 import os
 import subprocess
 
+# parsed projects, keyed by absolute pyproject path.  In a one-shot
+# CLI run this is just a dict, but under the zb daemon it keeps
+# projects warm between invocations
+_project_cache = {}
+
+
+def find_project_file(project_path):
+    """
+    Returns the absolute path to the pyproject.toml for project_path, which
+    may be either the file itself or the folder containing it.
+    """
+    project_file = None
+    if os.path.isdir(project_path):
+        for p in os.listdir(project_path):
+            if p.lower() == "pyproject.toml":
+                project_file = os.path.join(project_path, p)
+                break
+    else:
+        project_file = project_path
+    return os.path.abspath(project_file)
+
+
 class PyProject:
     def __init__(self, project_path):
         assert project_path is not None, "No project path supplied"
         assert os.path.exists(project_path), "Supplied project does not exist"
 
-        self.project_file = None
-
-        if os.path.isdir(project_path):
-            for p in os.listdir(project_path):
-                if p.lower() == "pyproject.toml":
-                    self.project_file = os.path.join(project_path, p)
-                    break
-        else:
-            self.project_file = project_path
-
-        self.project_file = os.path.abspath(self.project_file)
+        self.project_file = find_project_file(project_path)
         self.project_root = os.path.dirname(self.project_file)
 
         with open(self.project_file, "rb") as handle:
@@ -26,6 +41,35 @@ class PyProject:
     def find_virtualenv(self):
         return os.path.join(self.project_root, ".venv")
 
+    def find_site_packages(self):
+        """
+        Returns the site-packages folder of the project's virtualenv: Lib/site-packages
+        on Windows, lib/pythonX.Y/site-packages elsewhere.
+        """
+        venv = self.find_virtualenv()
+        windows_layout = os.path.join(venv, "Lib", "site-packages")
+        if os.path.isdir(windows_layout):
+            return windows_layout
+        candidates = sorted(glob.glob(os.path.join(venv, "lib", "python*", "site-packages")))
+        if candidates:
+            return candidates[-1]
+        return windows_layout
+
+    def find_matrix_virtualenv(self, python):
+        """
+        Returns the path of the environment used for testing against a specific
+        interpreter. These live alongside the project's own .venv so that uv can
+        reuse its cache when provisioning them.
+
+        uv accepts paths and specs as well as versions, so anything that isn't
+        safe in a single folder name is replaced, with a short hash to keep
+        different requests apart.
+        """
+        folder = re.sub(r"[^A-Za-z0-9._@-]", "_", python)
+        if folder != python:
+            folder += "-" + hashlib.sha1(python.encode()).hexdigest()[:8]
+        return os.path.join(self.project_root, ".zb-matrix", f"py{folder}")
+
     def find_package_dir(self):
         """
         Find the package name in the project. This is done by searching for the 'packages' key in the pyproject.toml file.
@@ -114,22 +158,36 @@ class PyProject:
         tokens.insert(0, self.project_root)
         return( os.path.join(*tokens))
 
-    def sync(self, dev = False):    
+    def sync(self, dev = False, python = None):    
         """
         Sync the project with the virtual environment.
+
+        If python is supplied, the environment for that interpreter (see
+        find_matrix_virtualenv) is synced instead, creating it if needed. uv's
+        output is captured in that case, so that concurrent syncs for several
+        interpreters don't interleave.
         """
-        venv = self.find_virtualenv()
-        if not os.path.exists(venv):
-            raise RuntimeError(f"Virtual environment not found at {venv}")
-        
         env = os.environ.copy()
-        env["VIRTUAL_ENV"] = venv
         sync_cmd = ["uv", "sync", "--no-install-project"]
+        stderr = None
+        if python:
+            venv = self.find_matrix_virtualenv(python)
+            env["UV_PROJECT_ENVIRONMENT"] = venv
+            sync_cmd.extend(["--python", python])
+            stderr = subprocess.PIPE
+        else:
+            venv = self.find_virtualenv()
+            if not os.path.exists(venv):
+                raise RuntimeError(f"Virtual environment not found at {venv}")
+        
+        env["VIRTUAL_ENV"] = venv
         if dev:
             sync_cmd.append("--dev")
         else:
             sync_cmd.append("--no-dev")
-        return subprocess.check_output(sync_cmd, cwd=self.project_root, env=env) == 0
+        return subprocess.check_output(
+            sync_cmd, cwd=self.project_root, env=env, stderr=stderr
+        ) == 0
             
 
     @property
@@ -154,3 +212,20 @@ class PyProject:
 
     def __repr__(self):
         return f"PyProject({self.project_file})"
+
+
+def load_project(project_path):
+    """
+    Returns a PyProject for the supplied path, reusing a previously parsed
+    instance if the pyproject.toml has not been modified since it was loaded.
+    """
+    project_file = find_project_file(project_path)
+    mtime = os.path.getmtime(project_file)
+
+    cached = _project_cache.get(project_file)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    project = PyProject(project_file)
+    _project_cache[project_file] = (mtime, project)
+    return project
@@ -9,7 +9,7 @@ import click
 import tqdm
 
 from .metadata import METADATA_FILE, create_archive_metadata
-from .project_info import PyProject
+from .project_info import PyProject, load_project
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -123,5 +123,5 @@ def main(project, source_dir,  output, optimize, verbose):
     if not project_path.exists():
         raise ValueError(f"Project {project} not found")
 
-    prj = PyProject(project_path)
+    prj = load_project(project_path)
     compile_tree(prj, source_dir, output, optimize)
@@ -0,0 +1,330 @@
+"""
+A streaming alternative to the self-extracting zip.
+
+A zip can't be unpacked until it has been completely copied, because its
+directory is at the end of the file. This format puts everything the unpacker
+needs to know up front, so entries can be extracted as they arrive - from a
+pipe, or from a file which is still being copied - and transfer and extraction
+overlap. Layout:
+
+    MAGIC, VERSION
+    u32 length + JSON header: deploy folder, checksum, environment.ini text,
+        the manifest (path, size and sha256 for every entry) and any
+        deduplicated native libraries as [duplicate, canonical] pairs
+    for each entry:
+        b"F", u16 length + utf-8 path,
+        zlib-compressed data as u32 length-prefixed chunks, ending with a 0 length
+    b"E"
+
+Every entry is checked against the manifest as it is extracted.
+
+This module only uses the standard library so that it can be copied to hosts
+without zoombuild installed and run as a script:
+
+    python stream_archive.py < app.bin.linux.zbs
+    python stream_archive.py --follow app.bin.linux.zbs
+"""
+
+import argparse
+import configparser
+import hashlib
+import json
+import os
+import shutil
+import struct
+import sys
+import time
+import zlib
+
+MAGIC = b"ZBSTREAM"
+VERSION = 1
+FILE_RECORD = b"F"
+END_RECORD = b"E"
+CHUNK_SIZE = 1024 * 1024
+
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+
+
+class StreamError(Exception):
+    pass
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as handle:
+        while chunk := handle.read(CHUNK_SIZE):
+            digest.update(chunk)
+            size += len(chunk)
+    return size, digest.hexdigest()
+
+
+def _source_chunks(source):
+    if isinstance(source, bytes):
+        yield source
+        return
+    with open(source, "rb") as handle:
+        while chunk := handle.read(CHUNK_SIZE):
+            yield chunk
+
+
+def build_manifest(entries):
+    """
+    Returns the manifest for (archive_path, source) pairs, where source is
+    either a file path or bytes
+    """
+    manifest = []
+    for archive_path, source in entries:
+        if isinstance(source, bytes):
+            size, digest = len(source), hashlib.sha256(source).hexdigest()
+        else:
+            size, digest = _file_digest(source)
+        manifest.append({"path": archive_path, "size": size, "sha256": digest})
+    return manifest
+
+
+def write_stream(
+    handle,
+    entries,
+    folder,
+    checksum,
+    metadata_file,
+    metadata_text,
+    duplicates=None,
+    progress=None,
+):
+    """
+    Writes (archive_path, source) entries to the binary file handle as a stream
+    archive. 'folder' and 'checksum' are used by the unpacker exactly as the
+    zip's environment.ini values are; metadata_text is written to
+    metadata_file in the deploy folder once extraction succeeds.  duplicates
+    maps archive paths which are not stored to the entry they are copies of.
+    """
+    entries = list(entries)
+    header = {
+        "folder": folder,
+        "checksum": checksum,
+        "metadata_file": metadata_file,
+        "metadata": metadata_text,
+        "manifest": build_manifest(entries),
+        "duplicates": sorted((duplicates or {}).items()),
+    }
+    header_bytes = json.dumps(header).encode("utf-8")
+
+    handle.write(MAGIC + bytes([VERSION]))
+    handle.write(_U32.pack(len(header_bytes)) + header_bytes)
+
+    for archive_path, source in entries:
+        path_bytes = archive_path.encode("utf-8")
+        handle.write(FILE_RECORD + _U16.pack(len(path_bytes)) + path_bytes)
+        compressor = zlib.compressobj()
+        for chunk in _source_chunks(source):
+            compressed = compressor.compress(chunk)
+            if compressed:
+                handle.write(_U32.pack(len(compressed)) + compressed)
+        compressed = compressor.flush()
+        if compressed:
+            handle.write(_U32.pack(len(compressed)) + compressed)
+        handle.write(_U32.pack(0))
+        if progress:
+            progress(archive_path)
+
+    handle.write(END_RECORD)
+
+
+class StreamReader:
+    """
+    Reads a stream archive from a binary file handle. With follow=True, running
+    out of data is treated as the file still being copied: the reader waits for
+    more, and only gives up after 'timeout' seconds without any.
+    """
+
+    def __init__(self, handle, follow=False, timeout=60.0, poll=0.2):
+        self.handle = handle
+        self.follow = follow
+        self.timeout = timeout
+        self.poll = poll
+        self.header = None
+
+    def _read_exact(self, count):
+        data = bytearray()
+        waited = 0.0
+        while len(data) < count:
+            chunk = self.handle.read(count - len(data))
+            if chunk:
+                data.extend(chunk)
+                waited = 0.0
+                continue
+            if not self.follow or waited >= self.timeout:
+                raise StreamError("archive is truncated")
+            time.sleep(self.poll)
+            waited += self.poll
+        return bytes(data)
+
+    def read_header(self):
+        if self.header is None:
+            magic = self._read_exact(len(MAGIC) + 1)
+            if magic[:-1] != MAGIC:
+                raise StreamError("not a zoombuild stream archive")
+            if magic[-1] != VERSION:
+                raise StreamError(f"unsupported stream archive version {magic[-1]}")
+            (length,) = _U32.unpack(self._read_exact(_U32.size))
+            self.header = json.loads(self._read_exact(length).decode("utf-8"))
+        return self.header
+
+    def _chunks(self):
+        decompressor = zlib.decompressobj()
+        while True:
+            (length,) = _U32.unpack(self._read_exact(_U32.size))
+            if not length:
+                break
+            yield decompressor.decompress(self._read_exact(length))
+        yield decompressor.flush()
+
+    def entries(self):
+        """
+        Yields (manifest_entry, chunks) for every entry in the archive. Each
+        chunks iterator must be consumed before moving on to the next entry.
+        """
+        manifest = {e["path"]: e for e in self.read_header()["manifest"]}
+        while True:
+            record = self._read_exact(1)
+            if record == END_RECORD:
+                return
+            if record != FILE_RECORD:
+                raise StreamError(f"unexpected record {record!r}")
+            (length,) = _U16.unpack(self._read_exact(_U16.size))
+            path = self._read_exact(length).decode("utf-8")
+            if path not in manifest:
+                raise StreamError(f"{path} is not in the manifest")
+            yield manifest[path], self._chunks()
+
+
+def read_header(path):
+    """
+    Returns the header of the stream archive at path
+    """
+    with open(path, "rb") as handle:
+        return StreamReader(handle).read_header()
+
+
+def _target_path(target_dir, archive_path):
+    target = os.path.normpath(os.path.join(target_dir, archive_path))
+    if os.path.isabs(archive_path) or not target.startswith(os.path.normpath(target_dir) + os.sep):
+        raise StreamError(f"{archive_path} would extract outside {target_dir}")
+    return target
+
+
+def extract(reader: StreamReader, target_dir):
+    """
+    Extracts every entry into target_dir as it arrives, checking its size and
+    checksum against the manifest. Writes the metadata file last, so a folder
+    holding it is known to be complete.
+    """
+    header = reader.read_header()
+    remaining = {e["path"] for e in header["manifest"]}
+
+    for entry, chunks in reader.entries():
+        target = _target_path(target_dir, entry["path"])
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        with open(target, "wb") as handle:
+            for chunk in chunks:
+                digest.update(chunk)
+                size += len(chunk)
+                handle.write(chunk)
+        if size != entry["size"] or digest.hexdigest() != entry["sha256"]:
+            raise StreamError(f"{entry['path']} does not match the manifest")
+        remaining.discard(entry["path"])
+
+    if remaining:
+        raise StreamError(f"archive ended with {len(remaining)} entries missing")
+
+    for duplicate, canonical in header.get("duplicates", []):
+        source = _target_path(target_dir, canonical)
+        target = _target_path(target_dir, duplicate)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            os.link(source, target)
+        except OSError:
+            shutil.copy2(source, target)
+
+    with open(os.path.join(target_dir, header["metadata_file"]), "w", encoding="utf-8") as handle:
+        handle.write(header["metadata"])
+
+
+def _deployed_checksum(deploy_path, metadata_file):
+    parser = configparser.ConfigParser()
+    parser.read(os.path.join(deploy_path, metadata_file))
+    for section in parser.sections():
+        if "checksum" in parser[section]:
+            return parser[section]["checksum"]
+    return None
+
+
+def deploy(reader: StreamReader, deploy_path=None):
+    """
+    The stream equivalent of the self-extracting zip's __main__: unpacks into
+    the deploy folder unless it already holds the same dependencies. The new
+    deployment is extracted next to the old one and only swapped in once it
+    is complete.
+    """
+    header = reader.read_header()
+    deploy_path = deploy_path or header["folder"]
+
+    if os.path.isdir(deploy_path):
+        saved_checksum = _deployed_checksum(deploy_path, header["metadata_file"])
+        print("archive checksum", header["checksum"], "disk checksum", saved_checksum)
+        if header["checksum"] == saved_checksum:
+            print("dependencies unchanged")
+            return
+        print("dependencies have changed, updating deployment")
+    else:
+        print("fresh deployment, unpacking into " + deploy_path)
+
+    incoming = deploy_path.rstrip("/\\") + ".incoming"
+    if os.path.isdir(incoming):
+        shutil.rmtree(incoming)
+    os.makedirs(incoming)
+    try:
+        extract(reader, incoming)
+    except Exception:
+        shutil.rmtree(incoming, ignore_errors=True)
+        raise
+
+    if os.path.isdir(deploy_path):
+        shutil.rmtree(deploy_path)
+    os.replace(incoming, deploy_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Unpack a zoombuild stream archive")
+    parser.add_argument("archive", nargs="?", default="-", help="archive path, or - for stdin")
+    parser.add_argument(
+        "--follow", action="store_true", help="keep reading while the archive is still growing"
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=60.0,
+        help="seconds to wait for more data with --follow",
+    )
+    parser.add_argument("--target", default=None, help="override the deploy folder")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.archive == "-":
+            deploy(StreamReader(sys.stdin.buffer), args.target)
+        else:
+            with open(args.archive, "rb") as handle:
+                reader = StreamReader(handle, follow=args.follow, timeout=args.timeout)
+                deploy(reader, args.target)
+    except StreamError as e:
+        print(f"error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
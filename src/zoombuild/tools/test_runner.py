@@ -2,11 +2,14 @@ import logging
 import os
 import subprocess
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
 from pathlib import Path
 
 import click
 
-from .project_info import PyProject
+from .project_info import load_project
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -16,9 +19,16 @@ handler.setFormatter(formatter)
 logger.addHandler(handler)
 
 
-def create_test_runner(prj, test_folder):
+def create_test_runner(prj, test_folder, python=None):
     test_env = os.environ.copy()
-    test_env["VIRTUAL_ENV"] = str(prj.find_virtualenv())
+    command = ["uv", "run", "--with", "pytest", "pytest", str(test_folder)]
+    if python:
+        venv = prj.find_matrix_virtualenv(python)
+        test_env["UV_PROJECT_ENVIRONMENT"] = venv
+        command[2:2] = ["--python", python]
+    else:
+        venv = prj.find_virtualenv()
+    test_env["VIRTUAL_ENV"] = str(venv)
     logger.debug(f"Running tests in: '{test_folder}")
 
     # this could probably be more elegant.  It looks like we need the
@@ -26,24 +36,115 @@ def create_test_runner(prj, test_folder):
     # inside the target project's venv -- if you do the more straightforward
     # 'uv run pytest' it seems to default to to runner for this project,
     # which would lead to weirdness when the target project is on a different
-    # version of python
+    # version of python.
+    # No shell: on POSIX, shell=True with a list runs only "uv" and drops
+    # the rest of the arguments
     runner = subprocess.Popen(
-        ["uv", "run", "--with", "pytest", "pytest", test_folder],
+        command,
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
         env=test_env,
         cwd=prj.project_root,
-        shell=True,
     )
 
     return runner
 
 
+@dataclass
+class MatrixResult:
+    python: str
+    returncode: int
+    stdout: bytes
+    stderr: bytes
+    elapsed: float
+    stage: str = "test"
+
+    @property
+    def status(self):
+        if self.returncode == 0:
+            return "passed"
+        if self.stage == "test" and self.returncode == 1:
+            return "failed"
+        return f"{self.stage} error {self.returncode}"
+
+
+def run_interpreter(prj, test_folder, python):
+    """
+    Provisions (or updates) the environment for one interpreter and runs the
+    tests in it
+    """
+    start = time.monotonic()
+    try:
+        prj.sync(dev=False, python=python)
+    except subprocess.CalledProcessError as e:
+        elapsed = time.monotonic() - start
+        return MatrixResult(
+            python, e.returncode, e.output or b"", e.stderr or b"", elapsed, "sync"
+        )
+
+    runner = create_test_runner(prj, test_folder, python=python)
+    stdout, stderr = runner.communicate()
+    return MatrixResult(python, runner.returncode, stdout, stderr, time.monotonic() - start)
+
+
+def run_matrix(prj, test_folder, pythons, jobs=0):
+    """
+    Runs the tests against each of the requested interpreters, at most
+    'jobs' at a time (0 runs them all at once).  Returns the results in
+    the order the interpreters were requested.
+    """
+    workers = jobs if jobs > 0 else len(pythons)
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_interpreter, prj, test_folder, py): py for py in pythons}
+        for future in as_completed(futures):
+            result = future.result()
+            logger.info(f"python {result.python}: {result.status} ({result.elapsed:.1f}s)")
+            results[result.python] = result
+    return [results[py] for py in pythons]
+
+
+def report_matrix(results):
+    """
+    Logs a combined report for a matrix run and returns the exit code: 1 if
+    any tests failed, otherwise the first error code, otherwise 0
+    """
+    for result in results:
+        if result.returncode == 0:
+            continue
+        logger.error(f"---- python {result.python}: {result.status} ----")
+        logger.error(f"stdout: {result.stdout.decode()}")
+        if result.status != "failed":
+            logger.error(f"stderr: {result.stderr.decode()}")
+
+    width = max(len(r.python) for r in results)
+    lines = [f"{'python'.ljust(width)}  result"]
+    for result in results:
+        lines.append(f"{result.python.ljust(width)}  {result.status} ({result.elapsed:.1f}s)")
+    logger.info("\n".join(lines))
+
+    if any(r.status == "failed" for r in results):
+        return 1
+    codes = [r.returncode for r in results if r.returncode != 0]
+    return codes[0] if codes else 0
+
+
 @click.command(help="Run all tests")
 @click.argument("project")
 @click.option("--verbose", is_flag=True, help="Increase logging verbosity")
 @click.option("--test-dir", default="tests", help="Directory containing tests")
-def main(project, verbose, test_dir):
+@click.option(
+    "--python",
+    "pythons",
+    multiple=True,
+    help="Test against this interpreter in its own environment; repeat for a matrix",
+)
+@click.option(
+    "--jobs",
+    default=0,
+    help="Maximum number of interpreters to test concurrently (default = all)",
+)
+def main(project, verbose, test_dir, pythons, jobs):
     if verbose:
         logger.setLevel(logging.DEBUG)
     else:
@@ -52,7 +153,7 @@ def main(project, verbose, test_dir):
     project_path = Path(project)
     if not project_path.exists():
         raise ValueError(f"Project {project} not found")
-    prj = PyProject(project_path)
+    prj = load_project(project_path)
 
     _test = test_dir
     if not _test:
@@ -72,6 +173,11 @@ def main(project, verbose, test_dir):
     if not test_folder.exists():
         raise RuntimeError(f"Could not find test directory in {prj.name}")
 
+    if pythons:
+        logger.info(f"testing {prj.name} against python {', '.join(pythons)}...")
+        results = run_matrix(prj, test_folder, list(dict.fromkeys(pythons)), jobs)
+        sys.exit(report_matrix(results))
+
     logger.info(f"syncing dependencies for {prj.name}...")
     prj.sync(dev=False)
     logger.info("sync complete")
@@ -1,5 +1,8 @@
 import zoombuild.tools.binary_packager
 import inspect
+import io
+
+from zoombuild.tools import stream_archive
 
 def test_main_imports():
     assert callable(zoombuild.tools.binary_packager.main)
@@ -12,4 +15,18 @@ def test_main_signature():
     assert "project" in sig.parameters
     assert "verbose" in sig.parameters
     assert "deploy_folder" in sig.parameters
-    assert "output" in sig.parameters
\ No newline at end of file
+    assert "output" in sig.parameters
+    assert "archive_format" in sig.parameters
+
+
+def test_validate_stream(tmp_path):
+    handle = io.BytesIO()
+    stream_archive.write_stream(handle, [("a.txt", b"a")], "deploy", "42", "environment.ini", "")
+    archive = tmp_path / "env.zbs"
+    archive.write_bytes(handle.getvalue())
+    assert zoombuild.tools.binary_packager.validate_stream("42", archive)
+    assert not zoombuild.tools.binary_packager.validate_stream("43", archive)
+
+    # left behind by an interrupted build
+    archive.write_bytes(handle.getvalue()[:12])
+    assert not zoombuild.tools.binary_packager.validate_stream("42", archive)
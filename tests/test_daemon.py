@@ -0,0 +1,145 @@
+import io
+import logging
+import os
+import subprocess
+import sys
+import threading
+import types
+
+import click
+import pytest
+
+from zoombuild.tools import __version__, client, daemon, native_libs
+
+pytestmark = pytest.mark.skipif(not client.daemon_supported(), reason="needs unix sockets")
+
+
+@pytest.fixture
+def running_daemon(tmp_path):
+    path = str(tmp_path / "zb.sock")
+    server = daemon.DaemonServer(path, daemon._RequestHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield path
+    server.shutdown()
+    server.server_close()
+
+
+def test_forward_without_daemon(tmp_path, monkeypatch):
+    monkeypatch.setenv(client.SOCKET_ENV, str(tmp_path / "missing.sock"))
+    assert client.forward("package", ["--help"]) is None
+
+
+def test_forward_disabled(running_daemon, monkeypatch):
+    monkeypatch.setenv(client.NO_DAEMON_ENV, "1")
+    assert client.forward("package", ["--help"], path=running_daemon) is None
+
+
+def test_ping(running_daemon):
+    reply = client.request({"command": "ping"}, running_daemon)
+    assert reply == {"exit": 0, "pid": os.getpid()}
+
+
+def test_forward_replays_output(running_daemon):
+    out = io.StringIO()
+    message = {
+        "command": "run",
+        "tool": "package",
+        "args": ["--help"],
+        "cwd": os.getcwd(),
+        "executable": sys.executable,
+        "version": __version__,
+    }
+    reply = client.request(message, running_daemon, stdout=out)
+    assert reply["exit"] == 0
+    assert "Usage: zb-package" in out.getvalue()
+
+
+def test_refuses_other_interpreter(running_daemon):
+    message = {
+        "command": "run",
+        "tool": "package",
+        "args": ["--help"],
+        "cwd": os.getcwd(),
+        "executable": "/other/project/.venv/bin/python",
+        "version": __version__,
+    }
+    reply = client.request(message, running_daemon)
+    assert reply["refused"]
+
+
+def test_version_mismatch_falls_back(running_daemon, monkeypatch):
+    # the real thing is forwarded...
+    assert client.forward("package", ["--help"], path=running_daemon) == 0
+    # ...but a client from another zoombuild release runs in-process
+    monkeypatch.setattr(client, "__version__", "0.0.0-other")
+    assert client.forward("package", ["--help"], path=running_daemon) is None
+
+
+def test_bad_request(running_daemon):
+    err = io.StringIO()
+    reply = client.request({"command": "nonsense"}, running_daemon, stderr=err)
+    assert reply["exit"] == 2
+    assert "bad request" in err.getvalue()
+
+
+def test_environment_is_filtered(monkeypatch):
+    monkeypatch.setenv("UV_INDEX_URL", "https://example.com/simple")
+    monkeypatch.setenv("GITHUB_TOKEN", "secret")
+    forwarded = client.forwarded_environment()
+    assert forwarded["UV_INDEX_URL"] == "https://example.com/simple"
+    assert "PATH" in forwarded
+    assert "GITHUB_TOKEN" not in forwarded
+
+
+def test_client_environment_keeps_daemon_secrets_out(monkeypatch):
+    monkeypatch.setenv("UV_CACHE_DIR", "/daemon/cache")
+    monkeypatch.setenv("LANG", "C.UTF-8")
+    merged = daemon._client_environment({"GITHUB_TOKEN": "secret", "PATH": "/client/bin"})
+    assert merged["PATH"] == "/client/bin"
+    assert merged["LANG"] == "C.UTF-8"
+    assert "UV_CACHE_DIR" not in merged
+    assert "GITHUB_TOKEN" not in merged
+
+
+def test_ignores_shared_socket_dir(running_daemon):
+    folder = os.path.dirname(running_daemon)
+    os.chmod(folder, 0o777)
+    try:
+        assert client.connect(running_daemon) is None
+    finally:
+        os.chmod(folder, 0o700)
+    conn = client.connect(running_daemon)
+    assert conn is not None
+    conn.close()
+
+
+def test_child_process_output_is_forwarded():
+    out = io.StringIO()
+    err = io.StringIO()
+    with daemon._redirect_fds(out, err):
+        subprocess.run(["sh", "-c", "echo to-stdout; echo to-stderr >&2"], check=True)
+    assert out.getvalue() == "to-stdout\n"
+    assert err.getvalue() == "to-stderr\n"
+
+
+def test_library_logging_reaches_client(monkeypatch):
+    # a stand-in tool which logs through another zoombuild module's logger
+    tool = types.ModuleType("zoombuild.tools.fake_tool")
+    tool.logger = logging.getLogger("zoombuild.tools.fake_tool")
+
+    @click.command()
+    def main():
+        native_libs.logger.info("stripped 3 native libraries")
+
+    tool.main = main
+    monkeypatch.setitem(sys.modules, tool.__name__, tool)
+    monkeypatch.setitem(client.TOOLS, "fake", tool.__name__)
+
+    original_stream = native_libs.handler.stream
+    out = io.StringIO()
+    err = io.StringIO()
+    code = daemon.run_tool("fake", [], os.getcwd(), None, out, err)
+    assert code == 0
+    assert "stripped 3 native libraries" in err.getvalue()
+    assert native_libs.handler.stream is original_stream
@@ -0,0 +1,180 @@
+import configparser
+import io
+import pathlib
+import shutil
+import subprocess
+import zipfile
+
+import pytest
+
+import zoombuild.tools.binary_packager
+from zoombuild.tools import metadata, native_libs, stream_archive
+
+needs_toolchain = pytest.mark.skipif(
+    not (shutil.which("gcc") and native_libs.find_objcopy()), reason="needs gcc and objcopy"
+)
+
+
+def _files(root):
+    return [(p, p.relative_to(root)) for p in sorted(root.rglob("*")) if p.is_file()]
+
+
+def _build_library(path):
+    source = path.with_suffix(".c")
+    source.write_text("int answer(void) { return 42; }\n")
+    subprocess.check_call(["gcc", "-g", "-shared", "-fPIC", "-o", str(path), str(source)])
+    source.unlink()
+
+
+def test_is_native_library():
+    assert native_libs.is_native_library("numpy/core/_multiarray.cpython-313.so")
+    assert native_libs.is_native_library("numpy.libs/libgomp-a34b3233.so.1.0.0")
+    assert native_libs.is_native_library("pkg/_speedups.pyd")
+    assert not native_libs.is_native_library("pkg/module.py")
+
+
+def test_find_duplicates(tmp_path):
+    (tmp_path / "a.libs").mkdir()
+    (tmp_path / "b.libs").mkdir()
+    (tmp_path / "a.libs" / "libgomp-1234.so.1").write_bytes(b"\x7fELF same")
+    (tmp_path / "b.libs" / "libgomp-5678.so.1").write_bytes(b"\x7fELF same")
+    (tmp_path / "b.libs" / "libother.so").write_bytes(b"\x7fELF diff")
+    (tmp_path / "b.libs" / "copy.txt").write_bytes(b"\x7fELF same")
+
+    duplicates = native_libs.find_duplicates(_files(tmp_path))
+    assert duplicates == {
+        pathlib.Path("b.libs/libgomp-5678.so.1"): pathlib.Path("a.libs/libgomp-1234.so.1")
+    }
+
+
+def test_dedup_drops_duplicates(tmp_path):
+    site = tmp_path / "site"
+    site.mkdir()
+    (site / "one.so").write_bytes(b"same")
+    (site / "two.so").write_bytes(b"same")
+
+    files, report = native_libs.process_native_libraries(
+        _files(site), tmp_path / "work", dedup=True
+    )
+    assert [arc for _, arc in files] == [pathlib.Path("one.so")]
+    assert report.duplicate_bytes == 4
+
+
+@needs_toolchain
+def test_strip_keeps_venv_untouched(tmp_path):
+    site = tmp_path / "site"
+    site.mkdir()
+    library = site / "_ext.so"
+    _build_library(library)
+    original = library.read_bytes()
+    debug_archive = tmp_path / "app.debug.zip"
+
+    files, report = native_libs.process_native_libraries(
+        _files(site), tmp_path / "work", strip=True, debug_archive=debug_archive
+    )
+    (stripped, _), = files
+    assert library.read_bytes() == original
+    assert stripped != library
+    assert stripped.stat().st_size < len(original)
+    assert report.stripped == [pathlib.Path("_ext.so")]
+    with zipfile.ZipFile(debug_archive) as archive:
+        assert archive.namelist() == ["_ext.so.debug"]
+
+
+@needs_toolchain
+def test_strip_skips_already_stripped(tmp_path):
+    site = tmp_path / "site"
+    site.mkdir()
+    _build_library(site / "_ext.so")
+    subprocess.check_call([native_libs.find_objcopy(), "--strip-debug", str(site / "_ext.so")])
+
+    files, report = native_libs.process_native_libraries(
+        _files(site), tmp_path / "work", strip=True
+    )
+    assert files == _files(site)
+    assert report.stripped == []
+
+
+def test_metadata_records_duplicates():
+    report = native_libs.NativeReport()
+    report.duplicates = {pathlib.Path("B.libs/libX.so"): pathlib.Path("a.libs/libX.so")}
+    cfg = configparser.ConfigParser()
+    metadata.add_native_metadata(report, cfg)
+    tmp = io.StringIO()
+    cfg.write(tmp)
+
+    parsed = configparser.ConfigParser()
+    parsed.read_string(tmp.getvalue())
+    native = parsed[metadata.NATIVE_KEY]
+    assert native["deduplicated"] == "1"
+    assert native[metadata.DUPLICATES_KEY] == "B.libs/libX.so -> a.libs/libX.so"
+
+
+def test_stream_restores_duplicates(tmp_path):
+    handle = io.BytesIO()
+    stream_archive.write_stream(
+        handle,
+        [("a.libs/libX.so", b"library")],
+        "deploy",
+        "1",
+        "environment.ini",
+        "",
+        duplicates={"b.libs/libX.so": "a.libs/libX.so"},
+    )
+    handle.seek(0)
+    stream_archive.extract(stream_archive.StreamReader(handle), tmp_path)
+    assert (tmp_path / "b.libs" / "libX.so").read_bytes() == b"library"
+
+
+@needs_toolchain
+def test_unstrippable_library_is_kept(tmp_path):
+    site = tmp_path / "site"
+    site.mkdir()
+    _build_library(site / "_good.so")
+    (site / "_bad.so").write_bytes(native_libs.ELF_MAGIC + b"not really an elf file")
+
+    files, report = native_libs.process_native_libraries(
+        _files(site), tmp_path / "work", strip=True
+    )
+    paths = {arc: full for full, arc in files}
+    assert paths[pathlib.Path("_bad.so")] == site / "_bad.so"
+    assert report.stripped == [pathlib.Path("_good.so")]
+
+
+def test_native_options_change_checksum():
+    checksum = "12345"
+    native_checksum = zoombuild.tools.binary_packager._native_checksum
+    results = {
+        native_checksum(checksum, False, False, False),
+        native_checksum(checksum, True, False, False),
+        native_checksum(checksum, True, True, False),
+        native_checksum(checksum, False, False, True),
+    }
+    assert len(results) == 4
+    assert native_checksum(checksum, False, False, False) == checksum
+
+
+def test_failed_strip_leaves_no_debug_file(tmp_path, monkeypatch):
+    # an objcopy which can extract the debug info, but not strip the library
+    objcopy = tmp_path / "objcopy"
+    objcopy.write_text(
+        "#!/bin/sh\n"
+        'if [ "$1" = "--only-keep-debug" ]; then cp "$2" "$3"; exit 0; fi\n'
+        "exit 1\n"
+    )
+    objcopy.chmod(0o755)
+    monkeypatch.setenv("OBJCOPY", str(objcopy))
+
+    site = tmp_path / "site"
+    site.mkdir()
+    (site / "_ext.so").write_bytes(native_libs.ELF_MAGIC + b"library")
+    debug_archive = tmp_path / "app.debug.zip"
+    work = tmp_path / "work"
+
+    files, report = native_libs.process_native_libraries(
+        _files(site), work, strip=True, debug_archive=debug_archive
+    )
+    assert files == _files(site)
+    assert report.stripped == []
+    assert not debug_archive.exists()
+    assert not [p for p in work.rglob("*") if p.is_file()]
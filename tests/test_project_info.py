@@ -1,5 +1,5 @@
 import os
-from zoombuild.tools.project_info import PyProject
+from zoombuild.tools.project_info import PyProject, load_project
 
 TOML_TESTS = os.path.join(os.path.dirname(__file__), "project_examples")
 
@@ -38,4 +38,42 @@ def test_source_from_pytest():
     result = test.find_package_dir()
     assert os.path.isabs(result)
     assert os.path.basename(result) == "src"
-    
\ No newline at end of file
+    
+
+def test_load_project_is_cached():
+    prj_file = os.path.join(TOML_TESTS, "pytest_prj.toml")
+    first = load_project(prj_file)
+    assert load_project(prj_file) is first
+    assert load_project(os.path.abspath(prj_file)) is first
+
+def test_matrix_virtualenv():
+    prj_file = os.path.join(TOML_TESTS, "pytest_prj.toml")
+    test = PyProject(prj_file)
+    result = test.find_matrix_virtualenv("3.12")
+    assert os.path.dirname(os.path.dirname(result)) == test.project_root
+    assert result != test.find_virtualenv()
+
+def test_posix_site_packages(tmp_path):
+    (tmp_path / "pyproject.toml").write_text('[project]\nname = "posix"\n')
+    site_packages = tmp_path / ".venv" / "lib" / "python3.13" / "site-packages"
+    site_packages.mkdir(parents=True)
+    assert PyProject(str(tmp_path)).find_site_packages() == str(site_packages)
+
+def test_windows_site_packages(tmp_path):
+    (tmp_path / "pyproject.toml").write_text('[project]\nname = "windows"\n')
+    site_packages = tmp_path / ".venv" / "Lib" / "site-packages"
+    site_packages.mkdir(parents=True)
+    assert PyProject(str(tmp_path)).find_site_packages() == str(site_packages)
+
+def test_matrix_virtualenv_stays_in_matrix_folder():
+    prj_file = os.path.join(TOML_TESTS, "pytest_prj.toml")
+    test = PyProject(prj_file)
+    matrix_root = os.path.join(test.project_root, ".zb-matrix")
+    results = set()
+    for python in ("3.12", "/usr/bin/python3.12", "../../x", "..", "cpython@3.13", "3.12 "):
+        result = test.find_matrix_virtualenv(python)
+        assert os.path.dirname(result) == matrix_root
+        assert os.path.normpath(result) == result
+        results.add(result)
+    assert len(results) == 6
+    assert test.find_matrix_virtualenv("3.12") == os.path.join(matrix_root, "py3.12")
@@ -0,0 +1,107 @@
+import configparser
+import io
+import os
+import threading
+import time
+
+import pytest
+
+from zoombuild.tools import stream_archive
+from zoombuild.tools.stream_archive import StreamError, StreamReader
+
+
+def _metadata(checksum):
+    cfg = configparser.ConfigParser()
+    cfg["deploy"] = {"folder": "deploy", "checksum": checksum}
+    tmp = io.StringIO()
+    cfg.write(tmp)
+    return tmp.getvalue()
+
+
+def _archive(tmp_path, checksum="123"):
+    source = tmp_path / "source.txt"
+    source.write_bytes(b"hello " * 100000)
+    entries = [("pkg/source.txt", source), ("requirements.txt", b"pytest\n")]
+    handle = io.BytesIO()
+    stream_archive.write_stream(
+        handle, entries, "deploy", checksum, "environment.ini", _metadata(checksum)
+    )
+    return handle.getvalue()
+
+
+def test_round_trip(tmp_path):
+    data = _archive(tmp_path)
+    target = tmp_path / "out"
+    target.mkdir()
+    stream_archive.extract(StreamReader(io.BytesIO(data)), target)
+    assert (target / "pkg" / "source.txt").read_bytes() == b"hello " * 100000
+    assert (target / "requirements.txt").read_bytes() == b"pytest\n"
+    assert (target / "environment.ini").exists()
+
+
+def test_header_is_up_front(tmp_path):
+    data = _archive(tmp_path)
+    header = StreamReader(io.BytesIO(data[:200000])).read_header()
+    assert header["checksum"] == "123"
+    assert [e["path"] for e in header["manifest"]] == ["pkg/source.txt", "requirements.txt"]
+
+
+def test_truncated(tmp_path):
+    data = _archive(tmp_path)
+    target = tmp_path / "out"
+    target.mkdir()
+    with pytest.raises(StreamError):
+        stream_archive.extract(StreamReader(io.BytesIO(data[:-10])), target)
+    assert not (target / "environment.ini").exists()
+
+
+def test_corrupt_entry(tmp_path, monkeypatch):
+    build_manifest = stream_archive.build_manifest
+
+    def bad_manifest(entries):
+        manifest = build_manifest(entries)
+        manifest[1]["sha256"] = "0" * 64
+        return manifest
+
+    monkeypatch.setattr(stream_archive, "build_manifest", bad_manifest)
+    data = _archive(tmp_path)
+    target = tmp_path / "out"
+    target.mkdir()
+    with pytest.raises(StreamError, match="requirements.txt"):
+        stream_archive.extract(StreamReader(io.BytesIO(data)), target)
+
+
+def test_follow_growing_file(tmp_path):
+    data = _archive(tmp_path)
+    growing = tmp_path / "growing.zbs"
+    growing.write_bytes(b"")
+
+    def copy():
+        with open(growing, "ab") as handle:
+            for offset in range(0, len(data), 4096):
+                handle.write(data[offset : offset + 4096])
+                handle.flush()
+                time.sleep(0.001)
+
+    writer = threading.Thread(target=copy)
+    writer.start()
+    target = tmp_path / "out"
+    target.mkdir()
+    with open(growing, "rb") as handle:
+        stream_archive.extract(StreamReader(handle, follow=True, timeout=5, poll=0.01), target)
+    writer.join()
+    assert (target / "requirements.txt").read_bytes() == b"pytest\n"
+
+
+def test_deploy_skips_unchanged(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    stream_archive.deploy(StreamReader(io.BytesIO(_archive(tmp_path))))
+    assert os.path.isdir("deploy")
+    os.remove(os.path.join("deploy", "requirements.txt"))
+
+    stream_archive.deploy(StreamReader(io.BytesIO(_archive(tmp_path))))
+    assert not os.path.exists(os.path.join("deploy", "requirements.txt"))
+
+    stream_archive.deploy(StreamReader(io.BytesIO(_archive(tmp_path, checksum="456"))))
+    assert os.path.exists(os.path.join("deploy", "requirements.txt"))
+    assert not os.path.exists("deploy.incoming")
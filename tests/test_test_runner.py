@@ -0,0 +1,85 @@
+import inspect
+import os
+import time
+
+import zoombuild.tools.test_runner
+from zoombuild.tools.project_info import PyProject
+from zoombuild.tools.test_runner import (
+    MatrixResult,
+    create_test_runner,
+    report_matrix,
+    run_matrix,
+)
+
+TOML_TESTS = os.path.join(os.path.dirname(__file__), "project_examples")
+
+
+class _FakePopen:
+    def __init__(self, command, **kwargs):
+        self.command = command
+        self.kwargs = kwargs
+
+
+def test_main_signature():
+    # using click we need to get the 'callback' to retrieve the original function
+    original_main = zoombuild.tools.test_runner.main.callback
+    sig = inspect.signature(original_main)
+    assert "project" in sig.parameters
+    assert "pythons" in sig.parameters
+    assert "jobs" in sig.parameters
+
+
+def test_matrix_keeps_requested_order(monkeypatch):
+    def fake_run(prj, test_folder, python):
+        # finish in the reverse order
+        time.sleep(0.1 if python == "3.11" else 0)
+        return MatrixResult(python, 0, b"", b"", 0.0)
+
+    monkeypatch.setattr(zoombuild.tools.test_runner, "run_interpreter", fake_run)
+    results = run_matrix(None, "tests", ["3.11", "3.12", "3.13"])
+    assert [r.python for r in results] == ["3.11", "3.12", "3.13"]
+
+
+def test_report_all_passed():
+    results = [MatrixResult("3.12", 0, b"", b"", 1.0), MatrixResult("3.13", 0, b"", b"", 1.0)]
+    assert report_matrix(results) == 0
+
+
+def test_report_failed_tests_win():
+    results = [
+        MatrixResult("3.11", 2, b"", b"", 1.0, "sync"),
+        MatrixResult("3.12", 1, b"", b"", 1.0),
+    ]
+    assert results[0].status == "sync error 2"
+    assert results[1].status == "failed"
+    assert report_matrix(results) == 1
+
+
+def test_report_errors():
+    results = [MatrixResult("3.12", 0, b"", b"", 1.0), MatrixResult("3.13", 4, b"", b"", 1.0)]
+    assert report_matrix(results) == 4
+
+
+def test_runner_command(monkeypatch):
+    monkeypatch.setattr(zoombuild.tools.test_runner.subprocess, "Popen", _FakePopen)
+    prj = PyProject(os.path.join(TOML_TESTS, "pytest_prj.toml"))
+
+    runner = create_test_runner(prj, "tests")
+    assert runner.command == ["uv", "run", "--with", "pytest", "pytest", "tests"]
+    assert runner.kwargs["env"]["VIRTUAL_ENV"] == prj.find_virtualenv()
+    assert not runner.kwargs.get("shell")
+
+
+def test_matrix_runner_command(monkeypatch):
+    monkeypatch.setattr(zoombuild.tools.test_runner.subprocess, "Popen", _FakePopen)
+    prj = PyProject(os.path.join(TOML_TESTS, "pytest_prj.toml"))
+
+    runner = create_test_runner(prj, "tests", python="3.12")
+    assert runner.command == [
+        "uv", "run", "--python", "3.12", "--with", "pytest", "pytest", "tests"
+    ]
+    env = runner.kwargs["env"]
+    assert env["UV_PROJECT_ENVIRONMENT"] == prj.find_matrix_virtualenv("3.12")
+    assert env["VIRTUAL_ENV"] == prj.find_matrix_virtualenv("3.12")
+    assert runner.kwargs["cwd"] == prj.project_root
+    assert not runner.kwargs.get("shell")